@@ -104,6 +104,10 @@ def save(session: ChatSession, filepath: str, format: str = "json", **kwargs):
         filepath: 输出文件路径
         format: 输出格式 ("json", "jsonl", "csv")
         **kwargs: 额外的导出参数
+
+    Note:
+        "jsonl" 格式支持追加写入（ChatSession.append_message /
+        JSONLExporter.append），新增消息时无需重写整个文件。
     """
     if format == "json":
         exporter = JSONExporter()
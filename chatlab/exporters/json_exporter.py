@@ -4,10 +4,94 @@ ChatLab 格式导出器
 支持导出为标准 JSON 和 JSON Lines 格式
 """
 
+import codecs
 import json
+from itertools import islice
 from pathlib import Path
-from typing import Union, Optional, Iterator
-from ..models import ChatSession, ChatMessage
+from typing import Any, Union, Optional, Iterator
+from ..models import ChatSession, ChatMessage, _format_datetimes
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+
+def _dumps(obj: Any, indent: Optional[int] = None, ensure_ascii: bool = False) -> bytes:
+    """
+    序列化为 UTF-8 编码的 JSON 字节
+
+    安装了 orjson 时优先使用（比标准库快数倍）；orjson 只支持 2 空格缩进
+    且总是输出 UTF-8，其余参数组合以及它无法序列化的数据（如超出 64 位的
+    整数）回退到标准库 json。
+    """
+    if orjson is not None and not ensure_ascii and indent in (None, 2):
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, option=option)
+        except orjson.JSONEncodeError:
+            pass
+    # 紧凑格式与 orjson 保持一致（无多余空格）
+    separators = (",", ":") if indent is None else None
+    return json.dumps(obj, indent=indent, ensure_ascii=ensure_ascii,
+                      separators=separators).encode("utf-8")
+
+
+# JSONL 记录的 _type 前缀：与序列化后的字典（去掉开头的 "{"）直接拼接，
+# 省去为每条记录构造 {"_type": ..., **data} 临时字典
+_HEADER_PREFIX = b'{"_type":"header",'
+_MEMBER_PREFIX = b'{"_type":"member",'
+_MESSAGE_PREFIX = b'{"_type":"message",'
+
+
+def _tagged(prefix: bytes, data: dict) -> bytes:
+    """序列化非空字典并在最前面插入 _type 字段"""
+    return prefix + _dumps(data)[1:]
+
+
+# 写入缓冲区大小：攒满后一次性写入，减少系统调用
+_WRITE_CHUNK = 1 << 20
+
+
+def _write_lines(f, lines: Iterator[bytes], encoding: str = "utf-8"):
+    """
+    将 JSONL 记录批量写入以 buffering=0 打开的二进制文件
+
+    记录先追加到 bytearray，每满约 1 MiB 才调用一次 write。
+    非 UTF-8 编码时整个文件共用一个增量编码器：BOM 只在文件开头写一次，
+    换行符也按目标编码输出（与文本模式的 open 行为一致）。
+    """
+    buf = bytearray()
+    if _is_utf8(encoding):
+        for line in lines:
+            buf += line
+            buf += b'\n'
+            if len(buf) >= _WRITE_CHUNK:
+                _flush(f, buf)
+    else:
+        encoder = codecs.getincrementalencoder(encoding)()
+        if f.tell() != 0:
+            # 追加到已有内容之后：不再写 BOM
+            encoder.setstate(0)
+        for line in lines:
+            buf += encoder.encode(line.decode("utf-8") + "\n")
+            if len(buf) >= _WRITE_CHUNK:
+                _flush(f, buf)
+        buf += encoder.encode("", final=True)
+    _flush(f, buf)
+
+
+def _flush(f, buf: bytearray):
+    """写出并清空缓冲区（无缓冲文件的 write 可能只写入一部分）"""
+    while buf:
+        del buf[:f.write(buf)]
+
+
+def _is_utf8(encoding: str) -> bool:
+    """判断编码是否为 UTF-8（可直接写入 _dumps 的输出）"""
+    return codecs.lookup(encoding).name == "utf-8"
 
 
 class JSONExporter:
@@ -31,9 +115,11 @@ class JSONExporter:
         filepath = Path(filepath)
         filepath.parent.mkdir(parents=True, exist_ok=True)
 
-        data = session.to_dict()
-        json_str = json.dumps(data, indent=indent, ensure_ascii=ensure_ascii)
-        filepath.write_text(json_str, encoding=encoding)
+        data = _dumps(session.to_dict(), indent=indent, ensure_ascii=ensure_ascii)
+        if _is_utf8(encoding):
+            filepath.write_bytes(data)
+        else:
+            filepath.write_text(data.decode("utf-8"), encoding=encoding)
 
     def export_string(self, session: ChatSession, 
                      indent: Optional[int] = 2,
@@ -62,44 +148,59 @@ class JSONLExporter:
         filepath = Path(filepath)
         filepath.parent.mkdir(parents=True, exist_ok=True)
 
-        with open(filepath, 'w', encoding=encoding) as f:
-            # 写入 header
-            header = {
-                "_type": "header",
-                "chatlab": session.chatlab.to_dict(),
-                "meta": session.meta.to_dict()
-            }
-            f.write(json.dumps(header, ensure_ascii=False) + '\n')
-
-            # 写入成员
-            for member in session.members:
-                member_line = {"_type": "member", **member.to_dict()}
-                f.write(json.dumps(member_line, ensure_ascii=False) + '\n')
-
-            # 写入消息
-            for msg in session.messages:
-                msg_line = {"_type": "message", **msg.to_dict()}
-                f.write(json.dumps(msg_line, ensure_ascii=False) + '\n')
+        with open(filepath, 'wb', buffering=0) as f:
+            _write_lines(f, self._iter_lines(session), encoding)
 
     def export_stream(self, session: ChatSession) -> Iterator[str]:
         """流式导出，生成器方式"""
+        for line in self._iter_lines(session):
+            yield line.decode("utf-8")
+
+    def _iter_lines(self, session: ChatSession) -> Iterator[bytes]:
+        """逐行生成 JSONL 记录（UTF-8 字节，不含换行符）"""
         # Header
         header = {
-            "_type": "header",
             "chatlab": session.chatlab.to_dict(),
             "meta": session.meta.to_dict()
         }
-        yield json.dumps(header, ensure_ascii=False)
+        yield _tagged(_HEADER_PREFIX, header)
 
-        # Members
+        # Members（可选字段固定输出，缺省为 null）
         for member in session.members:
-            member_line = {"_type": "member", **member.to_dict()}
-            yield json.dumps(member_line, ensure_ascii=False)
+            yield _tagged(_MEMBER_PREFIX, member._to_dict_full())
 
         # Messages
         for msg in session.messages:
-            msg_line = {"_type": "message", **msg.to_dict()}
-            yield json.dumps(msg_line, ensure_ascii=False)
+            yield self._message_line(msg)
+
+    def _message_line(self, msg: ChatMessage) -> bytes:
+        """单条消息的 JSONL 记录"""
+        return _tagged(_MESSAGE_PREFIX, msg._to_dict_full())
+
+    def append(self, session: ChatSession,
+               filepath: Union[str, Path],
+               since_index: int = 0,
+               encoding: str = "utf-8"):
+        """
+        以追加模式写入消息，无需重写整个文件
+
+        只写入 session.messages[since_index:]；文件不存在或为空时
+        写入完整的 header、成员和消息。
+
+        Args:
+            session: ChatSession 对象
+            filepath: JSONL 文件路径
+            since_index: 从该下标开始的消息会被追加
+            encoding: 文件编码
+        """
+        filepath = Path(filepath)
+        if not filepath.exists() or filepath.stat().st_size == 0:
+            self.export(session, filepath, encoding=encoding)
+            return
+
+        lines = map(self._message_line, islice(session.messages, since_index, None))
+        with open(filepath, 'ab', buffering=0) as f:
+            _write_lines(f, lines, encoding)
 
 
 class CSVExporter:
@@ -115,16 +216,14 @@ class CSVExporter:
         filepath = Path(filepath)
         filepath.parent.mkdir(parents=True, exist_ok=True)
 
-        with open(filepath, 'w', newline='', encoding=encoding) as f:
+        with open(filepath, 'w', newline='', encoding=encoding, buffering=1 << 20) as f:
             writer = csv.writer(f, delimiter=delimiter)
             writer.writerow(['timestamp', 'datetime', 'sender', 'account_name', 'type', 'content'])
 
-            for msg in session.messages:
-                writer.writerow([
-                    msg.timestamp,
-                    msg.datetime_str,
-                    msg.sender,
-                    msg.account_name,
-                    msg.type,
-                    msg.content
-                ])
+            # writerows 在 C 层迭代，避免逐行调用 writerow 的开销；
+            # 时间字符串每次导出时重新生成，不读取会话的查询缓存
+            messages = session.messages
+            writer.writerows(
+                (msg.timestamp, dt_str, msg.sender, msg.account_name, msg.type, msg.content)
+                for msg, dt_str in zip(messages, _format_datetimes(messages))
+            )
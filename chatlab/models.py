@@ -3,12 +3,91 @@ ChatLab Standard Format - 核心数据模型
 符合 ChatLab Standard Format Specification v0.0.1
 """
 
-from dataclasses import dataclass, field, asdict
-from typing import List, Dict, Any, Optional, Union
+from collections import defaultdict
+from dataclasses import dataclass, field, asdict, InitVar
+from itertools import islice
+from typing import List, Dict, Any, Optional, Union, TYPE_CHECKING
 from datetime import datetime
 from enum import IntEnum
 from pathlib import Path
-import json
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - 可选依赖
+    np = None
+
+if TYPE_CHECKING:  # pragma: no cover - 仅用于类型注解
+    import pandas as pd
+
+# pandas（连同 pyarrow）导入需要约 0.3 s，只有大会话的向量化实现用到，
+# 首次需要时才加载；False 表示尚未尝试导入，None 表示未安装
+_pd = False
+
+
+def _pandas():
+    """获取 pandas 模块，未安装时返回 None"""
+    global _pd
+    if _pd is False:
+        try:
+            import pandas
+        except ImportError:  # pragma: no cover - 可选依赖
+            pandas = None
+        _pd = pandas
+    return _pd
+
+# Python 3.10+ 为数据模型生成 __slots__，省去每个实例的 __dict__
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+# 消息时间的字符串格式（与 ChatMessage.datetime_str 一致）
+_DATETIME_FMT = "%Y-%m-%d %H:%M:%S"
+
+# 消息数达到该阈值且安装了 numpy/pandas 时，统计方法使用向量化实现
+_VECTORIZE_THRESHOLD = 10_000
+
+# uint32 能表示的最大秒级时间戳（2106-02-07）
+_UINT32_MAX = 2 ** 32 - 1
+
+
+def _utc_offsets(timestamps: "np.ndarray") -> "np.ndarray":
+    """
+    每个 Unix 时间戳在系统时区下的 UTC 偏移（秒）
+
+    与 datetime.fromtimestamp 使用同一套系统时区规则：按 15 分钟分桶，
+    每个桶只查询一次 time.localtime（现行时区的切换都发生在 15 分钟边界上）。
+    """
+    buckets, inverse = np.unique(timestamps // 900, return_inverse=True)
+    offsets = np.fromiter(
+        (time.localtime(int(b) * 900).tm_gmtoff for b in buckets),
+        dtype=np.int64, count=len(buckets)
+    )
+    return offsets[inverse.reshape(-1)]
+
+
+def _local_days(timestamps: "np.ndarray") -> "np.ndarray":
+    """将 Unix 时间戳数组转换为本地时区的日期（datetime64[D]）"""
+    local = timestamps + _utc_offsets(timestamps)
+    return local.astype("datetime64[s]").astype("datetime64[D]")
+
+
+def _format_datetimes(messages) -> List[str]:
+    """
+    逐条消息的时间字符串（与 ChatMessage.datetime_str 相同）
+
+    同一秒内的消息共享一次 strftime 结果。
+    """
+    memo = {}
+    fromtimestamp = datetime.fromtimestamp
+    dt_strs = []
+    append = dt_strs.append
+    for m in messages:
+        ts = m.timestamp
+        dt_str = memo.get(ts)
+        if dt_str is None:
+            dt_str = memo[ts] = fromtimestamp(ts).strftime(_DATETIME_FMT)
+        append(dt_str)
+    return dt_strs
 
 
 class MessageType(IntEnum):
@@ -32,15 +111,18 @@ class MessageType(IntEnum):
             return cls.TEXT
 
     def to_string(self) -> str:
-        names = {
-            0: "text", 1: "image", 2: "voice", 3: "video",
-            4: "file", 5: "location", 6: "link", 7: "sticker",
-            8: "system", 9: "revoked"
-        }
-        return names.get(self.value, "unknown")
+        value = self.value
+        return _MSG_TYPE_NAMES[value] if 0 <= value < len(_MSG_TYPE_NAMES) else "unknown"
 
 
-@dataclass
+# MessageType 取值对应的名称，按取值顺序排列
+_MSG_TYPE_NAMES = (
+    "text", "image", "voice", "video", "file",
+    "location", "link", "sticker", "system", "revoked"
+)
+
+
+@dataclass(**_SLOTS)
 class ChatLabVersion:
     """ChatLab 版本信息"""
     version: str
@@ -67,7 +149,7 @@ class ChatLabVersion:
         )
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class ChatMeta:
     """聊天元信息"""
     name: str
@@ -102,7 +184,7 @@ class ChatMeta:
         )
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class ChatMember:
     """聊天成员"""
     platform_id: str
@@ -124,6 +206,16 @@ class ChatMember:
             result["remark"] = self.remark
         return result
 
+    def _to_dict_full(self) -> Dict[str, Any]:
+        """批量导出用：固定包含全部键（缺省值为 None），省去逐字段判断"""
+        return {
+            "platformId": self.platform_id,
+            "accountName": self.account_name,
+            "role": self.role,
+            "avatar": self.avatar,
+            "remark": self.remark
+        }
+
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "ChatMember":
         return cls(
@@ -135,7 +227,7 @@ class ChatMember:
         )
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class ChatMessage:
     """单条聊天消息"""
     sender: str
@@ -146,20 +238,18 @@ class ChatMessage:
     platform_message_id: str
     reply_to: Optional[str] = None
 
-    # 内部字段
-    _datetime: Optional[datetime] = field(default=None, repr=False)
-
-    def __post_init__(self):
-        if self._datetime is None:
-            self._datetime = datetime.fromtimestamp(self.timestamp)
+    # 内部字段（首次访问 datetime 时才计算）
+    _datetime: Optional[datetime] = field(default=None, repr=False, compare=False)
 
     @property
     def datetime(self) -> datetime:
+        if self._datetime is None:
+            self._datetime = datetime.fromtimestamp(self.timestamp)
         return self._datetime
 
     @property
-    def datetime_str(self, fmt: str = "%Y-%m-%d %H:%M:%S") -> str:
-        return self._datetime.strftime(fmt)
+    def datetime_str(self, fmt: str = _DATETIME_FMT) -> str:
+        return self.datetime.strftime(fmt)
 
     @property
     def message_type(self) -> MessageType:
@@ -178,6 +268,18 @@ class ChatMessage:
             result["replyTo"] = self.reply_to
         return result
 
+    def _to_dict_full(self) -> Dict[str, Any]:
+        """批量导出用：固定包含全部 7 个键（replyTo 可能为 None），省去分支判断"""
+        return {
+            "sender": self.sender,
+            "accountName": self.account_name,
+            "timestamp": self.timestamp,
+            "type": self.type,
+            "content": self.content,
+            "platformMessageId": self.platform_message_id,
+            "replyTo": self.reply_to
+        }
+
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "ChatMessage":
         return cls(
@@ -195,6 +297,72 @@ class ChatMessage:
         return f"ChatMessage({self.account_name} @ {self.datetime_str}: {content})"
 
 
+class _MessageList(list):
+    """
+    记录修改次数的消息列表
+
+    所有原地修改列表的操作（增删、替换元素、排序、反转等）都会递增
+    version，ChatSession 据此判断查询缓存是否过期。
+    """
+
+    # 类属性作为初始值（反序列化时不会调用 __init__）
+    version = 0
+
+    def _modified(self):
+        self.version += 1
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self._modified()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._modified()
+
+    def __iadd__(self, other):
+        result = super().__iadd__(other)
+        self._modified()
+        return result
+
+    def __imul__(self, n):
+        result = super().__imul__(n)
+        self._modified()
+        return result
+
+    def append(self, item):
+        super().append(item)
+        self._modified()
+
+    def extend(self, items):
+        super().extend(items)
+        self._modified()
+
+    def insert(self, index, item):
+        super().insert(index, item)
+        self._modified()
+
+    def pop(self, index=-1):
+        item = super().pop(index)
+        self._modified()
+        return item
+
+    def remove(self, item):
+        super().remove(item)
+        self._modified()
+
+    def clear(self):
+        super().clear()
+        self._modified()
+
+    def sort(self, *, key=None, reverse=False):
+        super().sort(key=key, reverse=reverse)
+        self._modified()
+
+    def reverse(self):
+        super().reverse()
+        self._modified()
+
+
 @dataclass
 class ChatSession:
     """完整聊天会话"""
@@ -203,9 +371,57 @@ class ChatSession:
     members: List[ChatMember]
     messages: List[ChatMessage]
 
-    def __post_init__(self):
-        # 确保消息按时间排序
-        self.messages.sort(key=lambda x: x.timestamp)
+    # 调用方确认消息已按时间排序时传入 True，跳过排序检查
+    assume_sorted: InitVar[bool] = False
+
+    # 查询缓存（索引等），消息列表被替换或修改时自动失效
+    _cache: Dict[str, Any] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _cache_key: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+
+    def __setattr__(self, name, value):
+        if name == "messages":
+            # 统一包装为 _MessageList 以便检测原地修改（普通 list 会被复制一份，
+            # 之后对原列表的修改不会反映到会话中）；替换列表时作废缓存
+            if not isinstance(value, _MessageList):
+                value = _MessageList(value)
+            super().__setattr__("_cache_key", None)
+        super().__setattr__(name, value)
+
+    def __getstate__(self):
+        # 复制（copy/deepcopy）与序列化时不带上查询缓存，避免副本共享同一个缓存字典
+        state = self.__dict__.copy()
+        state["_cache"] = {}
+        state["_cache_key"] = None
+        return state
+
+    def __post_init__(self, assume_sorted: bool = False):
+        # 确保消息按时间排序（已有序时只做一次线性检查）
+        if not assume_sorted and not self._is_sorted():
+            self.messages.sort(key=lambda x: x.timestamp)
+
+    def _is_sorted(self) -> bool:
+        """消息是否已按时间戳非递减排列"""
+        messages = self.messages
+        return all(a.timestamp <= b.timestamp for a, b in zip(messages, islice(messages, 1, None)))
+
+    def _cached(self) -> Dict[str, Any]:
+        """获取查询缓存，消息列表被替换或修改过时先清空"""
+        # 替换列表时 __setattr__ 会把 _cache_key 置为 None，因此只需比较修改次数
+        key = self.messages.version
+        if key != self._cache_key:
+            self._cache.clear()
+            self._cache_key = key
+        return self._cache
+
+    def invalidate_cache(self):
+        """
+        清空查询缓存
+
+        对 messages 列表本身的修改（增删、替换元素、排序等）会被自动检测；
+        直接修改某条消息的字段（发送者、时间戳、内容等）后需要手动调用。
+        """
+        self._cache.clear()
+        self._cache_key = None
 
     def __repr__(self) -> str:
         return f"ChatSession('{self.meta.name}', {len(self.messages)} messages, {len(self.members)} members)"
@@ -219,76 +435,230 @@ class ChatSession:
         }
 
     def to_json(self, indent: Optional[int] = 2, ensure_ascii: bool = False) -> str:
-        return json.dumps(self.to_dict(), indent=indent, ensure_ascii=ensure_ascii)
+        from .exporters.json_exporter import _dumps
+        return _dumps(self.to_dict(), indent=indent, ensure_ascii=ensure_ascii).decode("utf-8")
 
     def save(self, filepath: Union[str, Path], indent: int = 2, encoding: str = "utf-8"):
-        """保存为 ChatLab 标准格式 JSON 文件"""
+        """
+        保存为 ChatLab 标准格式 JSON 文件
+
+        每次都会重写整个文件；需要频繁追加消息时请使用 JSONL 格式
+        （chatlab.save(..., format="jsonl") 配合 append_message）。
+        """
         Path(filepath).write_text(self.to_json(indent=indent), encoding=encoding)
 
+    def append_message(self, msg: ChatMessage, filepath: Union[str, Path], encoding: str = "utf-8"):
+        """
+        添加一条消息，并以追加模式写入 JSONL 文件
+
+        只写入一行记录，耗时与会话大小无关；文件不存在时写入完整会话。
+        消息应按时间顺序追加。
+
+        Args:
+            msg: 新消息
+            filepath: JSONL 文件路径
+            encoding: 文件编码
+        """
+        from .exporters.json_exporter import JSONLExporter
+        self.messages.append(msg)
+        JSONLExporter().append(self, filepath, since_index=len(self.messages) - 1, encoding=encoding)
+
     @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> "ChatSession":
+    def from_dict(cls, data: Dict[str, Any], assume_sorted: bool = False) -> "ChatSession":
         return cls(
             chatlab=ChatLabVersion.from_dict(data.get("chatlab", {})),
             meta=ChatMeta.from_dict(data.get("meta", {})),
             members=[ChatMember.from_dict(m) for m in data.get("members", [])],
-            messages=[ChatMessage.from_dict(m) for m in data.get("messages", [])]
+            messages=[ChatMessage.from_dict(m) for m in data.get("messages", [])],
+            assume_sorted=assume_sorted
         )
 
     # ========== 查询方法 ==========
 
+    def _build_indexes(self) -> Dict[str, Any]:
+        """一次遍历构建发送者/名称/类型/ID 索引"""
+        cache = self._cached()
+        if "by_sender" not in cache:
+            by_sender = defaultdict(list)
+            by_name = defaultdict(list)
+            by_type = defaultdict(list)
+            by_id = {}
+            for m in self.messages:
+                by_sender[m.sender].append(m)
+                by_name[m.account_name].append(m)
+                by_type[m.type].append(m)
+                by_id.setdefault(m.platform_message_id, m)
+            cache["by_sender"] = dict(by_sender)
+            cache["by_name"] = dict(by_name)
+            cache["by_type"] = dict(by_type)
+            cache["by_id"] = by_id
+        return cache
+
     def get_messages_by_sender(self, sender_id: str) -> List[ChatMessage]:
         """按发送者ID筛选"""
-        return [m for m in self.messages if m.sender == sender_id]
+        return list(self._build_indexes()["by_sender"].get(sender_id, ()))
 
     def get_messages_by_name(self, name: str) -> List[ChatMessage]:
         """按显示名称筛选"""
-        return [m for m in self.messages if m.account_name == name]
+        return list(self._build_indexes()["by_name"].get(name, ()))
 
     def get_messages_by_date(self, date_str: str) -> List[ChatMessage]:
         """按日期筛选 (YYYY-MM-DD)"""
-        return [m for m in self.messages if m.datetime_str.startswith(date_str)]
+        messages = self.messages
+        return [m for m, dt_str in zip(messages, _format_datetimes(messages))
+                if dt_str.startswith(date_str)]
 
     def get_messages_by_type(self, msg_type: Union[int, MessageType]) -> List[ChatMessage]:
         """按消息类型筛选"""
         type_val = msg_type.value if isinstance(msg_type, MessageType) else msg_type
-        return [m for m in self.messages if m.type == type_val]
+        return list(self._build_indexes()["by_type"].get(type_val, ()))
 
     def get_messages_by_keyword(self, keyword: str, case_sensitive: bool = False) -> List[ChatMessage]:
         """按关键词搜索内容"""
+        if len(self.messages) >= _VECTORIZE_THRESHOLD and _pandas() is not None:
+            column = self._content_column(lower=not case_sensitive)
+            if not case_sensitive:
+                keyword = keyword.lower()
+            mask = column.str.contains(keyword, regex=False, na=False).to_numpy(dtype=bool)
+            messages = self.messages
+            return [messages[i] for i in np.flatnonzero(mask)]
+
         if not case_sensitive:
             keyword = keyword.lower()
             return [m for m in self.messages if keyword in m.content.lower()]
         return [m for m in self.messages if keyword in m.content]
 
+    def _content_column(self, lower: bool = False) -> "pd.Series":
+        """
+        消息内容列（可选小写版本），缓存以便重复搜索
+
+        小写版本使用 Python 的 str.lower 生成：Arrow 的 lower 对 'İ'、词尾
+        'Σ' 等字符的处理与 str.lower 不同，会让结果随会话大小变化。
+        """
+        cache = self._cached()
+        key = "content_lower" if lower else "content"
+        column = cache.get(key)
+        if column is None:
+            pd = _pandas()
+            contents = [m.content for m in self.messages]
+            if lower:
+                contents = [c.lower() for c in contents]
+            try:
+                # Arrow 字符串列的 str.contains 在 C 层完成
+                column = pd.Series(contents, dtype="string[pyarrow]")
+            except (ImportError, ValueError):
+                # 未安装 pyarrow，或内容含 Arrow 无法编码的孤立代理字符
+                # （如被截断的 emoji，UnicodeEncodeError / ArrowInvalid 均为 ValueError 子类）
+                column = pd.Series(contents, dtype=object)
+            cache[key] = column
+        return column
+
     def get_message_by_id(self, msg_id: str) -> Optional[ChatMessage]:
         """通过平台消息ID查找"""
-        for m in self.messages:
-            if m.platform_message_id == msg_id:
-                return m
-        return None
+        return self._build_indexes()["by_id"].get(msg_id)
+
+    @property
+    def _ts_array(self) -> "np.ndarray":
+        """
+        所有消息时间戳组成的数组（列式存储），按会话缓存
+
+        按时间的批量计算只需扫描这一连续数组，不必逐条访问消息对象。
+        秒级时间戳（2106 年之前）存为 uint32，体积减半；超出该范围
+        （如毫秒级或负数时间戳）时为 int64。uint32 相减会回绕，使用方
+        需要先转换类型或屏蔽递减的位置。含小数时间戳时为 float64，
+        保留小数部分。
+
+        数组为只读，与其他缓存一样在消息列表变化时自动重建。
+        """
+        cache = self._cached()
+        ts = cache.get("ts_array")
+        if ts is None:
+            timestamps = [m.timestamp for m in self.messages]
+            if all(isinstance(t, int) for t in timestamps):
+                ts = np.array(timestamps, dtype=np.int64)
+                if len(ts) and ts.min() >= 0 and ts.max() <= _UINT32_MAX:
+                    ts = ts.astype(np.uint32)
+            else:
+                ts = np.array(timestamps, dtype=np.float64)
+            ts.flags.writeable = False
+            cache["ts_array"] = ts
+        return ts
+
+    def _datetime_strs(self) -> List[str]:
+        """
+        所有消息的时间字符串（与 datetime_str 相同），按会话缓存
+
+        供各统计方法复用同一份列表。返回的消息本身需要与时间严格对应时
+        （筛选、导出），应直接调用 _format_datetimes，不经过缓存。
+        """
+        cache = self._cached()
+        dt_strs = cache.get("datetime_strs")
+        if dt_strs is None:
+            dt_strs = cache["datetime_strs"] = _format_datetimes(self.messages)
+        return dt_strs
 
     def get_timeline(self) -> Dict[str, int]:
         """获取每日消息数量时间线"""
+        # 小数时间戳需要按 datetime.fromtimestamp 的舍入规则换算日期，走逐条计算
+        if (np is not None and len(self.messages) >= _VECTORIZE_THRESHOLD
+                and self._ts_array.dtype.kind != "f"):
+            days, counts = np.unique(_local_days(self._ts_array), return_counts=True)
+            return dict(zip(np.datetime_as_string(days, unit="D").tolist(), counts.tolist()))
+
         timeline = {}
-        for m in self.messages:
-            date = m.datetime_str[:10]  # YYYY-MM-DD
+        for dt_str in self._datetime_strs():
+            date = dt_str[:10]  # YYYY-MM-DD
             timeline[date] = timeline.get(date, 0) + 1
         return dict(sorted(timeline.items()))
 
     def get_sender_stats(self) -> Dict[str, Dict[str, Any]]:
         """获取发送者统计"""
+        if len(self.messages) >= _VECTORIZE_THRESHOLD and _pandas() is not None:
+            return self._sender_stats_vectorized()
+
         stats = {}
-        for m in self.messages:
+        for m, dt_str in zip(self.messages, self._datetime_strs()):
             key = m.sender
             if key not in stats:
                 stats[key] = {
                     "account_name": m.account_name,
                     "count": 0,
-                    "first_message": m.datetime_str,
-                    "last_message": m.datetime_str
+                    "first_message": dt_str,
+                    "last_message": dt_str
                 }
             stats[key]["count"] += 1
-            stats[key]["last_message"] = m.datetime_str
+            stats[key]["last_message"] = dt_str
+        return stats
+
+    def _sender_stats_vectorized(self) -> Dict[str, Dict[str, Any]]:
+        """get_sender_stats 的 pandas groupby 实现"""
+        messages = self.messages
+        df = _pandas().DataFrame({
+            "sender": [m.sender for m in messages],
+            "row": np.arange(len(messages)),
+            "timestamp": self._ts_array
+        })
+        # 只聚合行号和时间戳：groupby 的 first 会跳过空值，发送者和名称
+        # 直接从每组第一条消息读取（与逐条遍历一致，也保留 None 原值）
+        grouped = df.groupby("sender", sort=False, dropna=False).agg(
+            first_row=("row", "first"),
+            count=("row", "size"),
+            first=("timestamp", "first"),
+            last=("timestamp", "last")
+        )
+
+        def fmt(ts):
+            return datetime.fromtimestamp(ts).strftime(_DATETIME_FMT)
+
+        stats = {}
+        for first_row, count, first, last in zip(*(grouped[c].tolist() for c in grouped.columns)):
+            msg = messages[first_row]
+            stats[msg.sender] = {
+                "account_name": msg.account_name,
+                "count": count,
+                "first_message": fmt(first),
+                "last_message": fmt(last)
+            }
         return stats
 
     def get_statistics(self) -> Dict[str, Any]:
@@ -302,21 +672,48 @@ class ChatSession:
                 "timeline": {}
             }
 
+        # 单次遍历同时累计类型、时间线和发送者统计
+        raw_type_counts = {}
+        timeline = {}
+        sender_stats = {}
+        type_counts_get = raw_type_counts.get
+        timeline_get = timeline.get
+        sender_stats_get = sender_stats.get
+
+        for m, dt_str in zip(self.messages, self._datetime_strs()):
+            type_val = m.type
+            raw_type_counts[type_val] = type_counts_get(type_val, 0) + 1
+
+            date = dt_str[:10]  # YYYY-MM-DD
+            timeline[date] = timeline_get(date, 0) + 1
+
+            stats = sender_stats_get(m.sender)
+            if stats is None:
+                stats = sender_stats[m.sender] = {
+                    "account_name": m.account_name,
+                    "count": 0,
+                    "first_message": dt_str,
+                    "last_message": dt_str
+                }
+            stats["count"] += 1
+            stats["last_message"] = dt_str
+
+        # 原始类型值 -> 类型名称（未知类型按 text 计）
         type_counts = {}
-        for m in self.messages:
-            type_name = m.message_type.to_string()
-            type_counts[type_name] = type_counts.get(type_name, 0) + 1
+        for type_val, count in raw_type_counts.items():
+            type_name = MessageType.from_int(type_val).to_string()
+            type_counts[type_name] = type_counts.get(type_name, 0) + count
 
         return {
             "total_messages": len(self.messages),
-            "unique_senders": len(set(m.sender for m in self.messages)),
+            "unique_senders": len(sender_stats),
             "date_range": {
                 "start": self.messages[0].datetime_str,
                 "end": self.messages[-1].datetime_str
             },
             "message_types": type_counts,
-            "timeline": self.get_timeline(),
-            "sender_stats": self.get_sender_stats()
+            "timeline": dict(sorted(timeline.items())),
+            "sender_stats": sender_stats
         }
 
     def get_conversation_threads(self, max_gap_minutes: int = 30) -> List[List[ChatMessage]]:
@@ -326,25 +723,5 @@ class ChatSession:
         Args:
             max_gap_minutes: 最大间隔时间（分钟），超过则视为新对话
         """
-        if not self.messages:
-            return []
-
-        threads = []
-        current_thread = [self.messages[0]]
-
-        for i in range(1, len(self.messages)):
-            prev_msg = self.messages[i-1]
-            curr_msg = self.messages[i]
-
-            gap = (curr_msg.timestamp - prev_msg.timestamp) / 60
-
-            if gap > max_gap_minutes:
-                threads.append(current_thread)
-                current_thread = [curr_msg]
-            else:
-                current_thread.append(curr_msg)
-
-        if current_thread:
-            threads.append(current_thread)
-
-        return threads
+        from .utils.helpers import split_messages_into_chunks
+        return split_messages_into_chunks(self, max_gap_minutes)
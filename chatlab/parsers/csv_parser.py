@@ -5,10 +5,21 @@ CSV 格式解析器
 """
 
 import csv
+import io
+import warnings
 from pathlib import Path
-from typing import Union, List, Dict, Any
+from typing import Union, List, Dict, Any, Tuple, TYPE_CHECKING
 from datetime import datetime
-from ..models import ChatSession, ChatMessage, ChatMeta, ChatLabVersion, ChatMember
+from ..models import ChatSession, ChatMessage, ChatMeta, ChatLabVersion, ChatMember, _utc_offsets, _pandas
+from .json_parser import _is_file
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - 可选依赖
+    np = None
+
+if TYPE_CHECKING:  # pragma: no cover - 仅用于类型注解
+    import pandas as pd
 
 
 class CSVParser:
@@ -30,8 +41,27 @@ class CSVParser:
         'type': ['type', 'msg_type', '类型', 'Type']
     }
 
+    # 小写列名 -> 标准列名，列检测时每个表头只需一次字典查找
+    _VARIANT_TO_STD = {
+        variant.lower(): standard_name
+        for standard_name, variants in COLUMN_MAPPINGS.items()
+        for variant in variants
+    }
+
+    # 常见日期格式（按尝试顺序）
+    TIME_FORMATS = (
+        "%Y-%m-%d %H:%M:%S",
+        "%Y/%m/%d %H:%M:%S",
+        "%d/%m/%Y %H:%M:%S",
+        "%Y-%m-%d",
+        "%H:%M:%S",
+        "%Y年%m月%d日 %H:%M"
+    )
+
     def __init__(self):
         self.column_map = {}
+        # 上一次解析成功的日期格式，同一文件的时间格式通常一致
+        self._last_good_fmt = None
 
     def parse(self, source: Union[str, Path], 
               platform: str = "unknown",
@@ -50,34 +80,24 @@ class CSVParser:
             delimiter: 分隔符
             **kwargs: 额外的元数据
         """
-        if isinstance(source, (str, Path)) and Path(source).exists():
-            filepath = Path(source)
-            with open(filepath, 'r', encoding=encoding) as f:
-                reader = csv.DictReader(f, delimiter=delimiter)
-                rows = list(reader)
-        else:
-            import io
-            f = io.StringIO(source)
-            reader = csv.DictReader(f, delimiter=delimiter)
-            rows = list(reader)
-
-        if not rows:
-            raise ValueError("CSV 文件为空")
+        messages = None
+        pd = _pandas()
+        if pd is not None:
+            try:
+                df = self._read_dataframe(source, encoding, delimiter)
+            except (pd.errors.ParserError, pd.errors.ParserWarning):
+                df = None  # 行字段数与表头不一致等不规整的文件交给标准库 csv
+            if df is not None:
+                messages = self._parse_dataframe(df)
 
-        # 自动检测列映射
-        self._detect_columns(rows[0].keys())
+        if messages is None:
+            messages = self._parse_rows(self._read_rows(source, encoding, delimiter))
 
-        # 解析消息
-        messages = []
+        # 收集成员信息
         members_map = {}
-
-        for idx, row in enumerate(rows):
-            msg = self._parse_row(row, idx)
-            if msg:
-                messages.append(msg)
-                # 收集成员信息
-                if msg.sender not in members_map:
-                    members_map[msg.sender] = msg.account_name
+        for msg in messages:
+            if msg.sender not in members_map:
+                members_map[msg.sender] = msg.account_name
 
         # 构建成员列表
         members = [
@@ -106,16 +126,142 @@ class CSVParser:
             messages=messages
         )
 
+    def _read_rows(self, source: Union[str, Path], encoding: str,
+                   delimiter: str) -> List[Dict[str, str]]:
+        """使用标准库 csv 读取所有行"""
+        if _is_file(source):
+            with open(source, 'r', encoding=encoding) as f:
+                return list(csv.DictReader(f, delimiter=delimiter))
+        return list(csv.DictReader(io.StringIO(source), delimiter=delimiter))
+
+    def _parse_rows(self, rows: List[Dict[str, str]]) -> List[ChatMessage]:
+        """逐行解析 csv.DictReader 的结果"""
+        if not rows:
+            raise ValueError("CSV 文件为空")
+
+        # 自动检测列映射
+        self._detect_columns(rows[0].keys())
+
+        messages = []
+        for idx, row in enumerate(rows):
+            msg = self._parse_row(row, idx)
+            if msg:
+                messages.append(msg)
+        return messages
+
+    def _read_dataframe(self, source: Union[str, Path], encoding: str,
+                        delimiter: str) -> "pd.DataFrame":
+        """使用 pandas 读取 CSV，所有列按字符串读取"""
+        pd = _pandas()
+        if not _is_file(source):
+            source = io.StringIO(source)
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("error", pd.errors.ParserWarning)
+                df = pd.read_csv(source, sep=delimiter, encoding=encoding, dtype=str,
+                                 keep_default_na=False, index_col=False)
+        except pd.errors.EmptyDataError:
+            raise ValueError("CSV 文件为空")
+        return df.fillna('')
+
+    def _parse_dataframe(self, df: "pd.DataFrame") -> List[ChatMessage]:
+        """按列批量解析，语义与 _parse_row 一致"""
+        if df.empty:
+            raise ValueError("CSV 文件为空")
+
+        # 自动检测列映射
+        self._detect_columns(list(df.columns))
+
+        n = len(df)
+
+        def column(name, default):
+            return df[name].tolist() if name in df.columns else default
+
+        time_col = self.column_map.get('time', 'time')
+        if time_col in df.columns:
+            timestamps = self._parse_timestamps(df[time_col])
+        else:
+            timestamps = list(range(n))  # 使用行号作为备用
+
+        sender_col = self.column_map.get('sender', 'sender')
+        senders = column(sender_col, ['unknown'] * n)
+
+        name_col = self.column_map.get('name', sender_col)
+        names = column(name_col, senders)
+
+        contents = column(self.column_map.get('content', 'content'), [''] * n)
+
+        type_col = self.column_map.get('type', 'type')
+        if type_col in df.columns:
+            types = [int(t) if t else 0 for t in df[type_col].tolist()]
+        else:
+            types = [0] * n
+
+        return [
+            ChatMessage(
+                sender=sender,
+                account_name=account_name,
+                timestamp=timestamp,
+                type=type_val,
+                content=content,
+                platform_message_id=f"csv_{idx}"
+            )
+            for idx, (sender, account_name, timestamp, type_val, content)
+            in enumerate(zip(senders, names, timestamps, types, contents))
+        ]
+
+    def _parse_timestamps(self, values: "pd.Series") -> List[int]:
+        """
+        批量解析时间列
+
+        先整列尝试 Unix 时间戳和各个日期格式，剩余的行（包括本地时区切换
+        附近的时间）再逐行交给 _parse_timestamp，解析失败时使用行号。
+        """
+        pd = _pandas()
+        raw = values.tolist()
+        col = values.str.strip()
+        n = len(col)
+        result = np.zeros(n, dtype=np.int64)
+        done = np.zeros(n, dtype=bool)
+
+        # Unix 时间戳（与 int(float(x)) 一样向零截断）
+        numeric = pd.to_numeric(col, errors="coerce").to_numpy(dtype=float)
+        ok = np.isfinite(numeric) & (np.abs(numeric) < 2.0 ** 53)
+        result[ok] = np.trunc(numeric[ok]).astype(np.int64)
+        done |= ok
+
+        for fmt in self.TIME_FORMATS:
+            pending = np.flatnonzero(~done)
+            if not len(pending):
+                break
+            parsed = pd.to_datetime(col.iloc[pending], format=fmt, errors="coerce")
+            hit = parsed.notna().to_numpy()
+            if not hit.any():
+                continue
+            naive = parsed[hit].to_numpy(dtype="datetime64[s]").astype(np.int64)
+            timestamps, exact = _naive_to_timestamps(naive)
+            rows = pending[hit][exact]
+            result[rows] = timestamps[exact]
+            done[rows] = True
+
+        timestamps = result.tolist()
+        for idx in np.flatnonzero(~done).tolist():
+            try:
+                timestamps[idx] = self._parse_timestamp(raw[idx])
+            except ValueError:
+                timestamps[idx] = idx  # 使用行号作为备用
+        return timestamps
+
     def _detect_columns(self, headers: List[str]):
         """自动检测列名映射"""
-        headers_lower = [h.lower().strip() for h in headers]
-
-        for standard_name, variants in self.COLUMN_MAPPINGS.items():
-            for variant in variants:
-                if variant.lower() in headers_lower:
-                    idx = headers_lower.index(variant.lower())
-                    self.column_map[standard_name] = headers[idx]
-                    break
+        detected = {}
+        for header in headers:
+            if not isinstance(header, str):
+                continue  # DictReader 把多余字段放在 None 键下
+            standard_name = self._VARIANT_TO_STD.get(header.lower().strip())
+            if standard_name and standard_name not in detected:
+                detected[standard_name] = header
+        self.column_map.update(detected)
 
     def _parse_row(self, row: Dict[str, str], idx: int) -> ChatMessage:
         """解析单行数据"""
@@ -161,24 +307,60 @@ class CSVParser:
         # 尝试 Unix 时间戳
         try:
             return int(float(ts_str))
-        except:
+        except (ValueError, OverflowError):
             pass
 
-        # 尝试常见日期格式
-        formats = [
-            "%Y-%m-%d %H:%M:%S",
-            "%Y/%m/%d %H:%M:%S",
-            "%d/%m/%Y %H:%M:%S",
-            "%Y-%m-%d",
-            "%H:%M:%S",
-            "%Y年%m月%d日 %H:%M"
-        ]
+        # ISO 8601（C 实现，覆盖最常见的 YYYY-MM-DD[ HH:MM:SS]）
+        try:
+            return int(datetime.fromisoformat(ts_str).timestamp())
+        except ValueError:
+            pass
 
-        for fmt in formats:
+        # 优先尝试上一次成功的格式
+        last_fmt = self._last_good_fmt
+        if last_fmt is not None:
+            try:
+                return int(datetime.strptime(ts_str, last_fmt).timestamp())
+            except ValueError:
+                pass
+
+        for fmt in self.TIME_FORMATS:
+            if fmt == last_fmt:
+                continue
             try:
                 dt = datetime.strptime(ts_str, fmt)
-                return int(dt.timestamp())
-            except:
+            except ValueError:
                 continue
+            self._last_good_fmt = fmt
+            return int(dt.timestamp())
 
         raise ValueError(f"无法解析时间格式: {ts_str}")
+
+
+# datetime.timestamp() 换算时会前后各偏移约一天，datetime 取值范围两端的
+# 时间可能因此溢出（抛出 ValueError）；这一范围之外的时间交给逐行解析
+_SAFE_NAIVE_MIN = int((datetime(1, 1, 3) - datetime(1970, 1, 1)).total_seconds())
+_SAFE_NAIVE_MAX = int((datetime(9999, 12, 29) - datetime(1970, 1, 1)).total_seconds())
+
+
+def _naive_to_timestamps(naive: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    将按 UTC 解释的本地时间秒数换算为 Unix 时间戳
+
+    Returns:
+        (时间戳数组, 是否可靠的布尔数组)；前后一天内存在时区切换的时间，
+        以及接近 datetime 取值范围两端的时间标记为不可靠，由调用方逐行用
+        datetime.timestamp() 精确计算
+    """
+    safe = (naive >= _SAFE_NAIVE_MIN) & (naive <= _SAFE_NAIVE_MAX)
+    naive = np.where(safe, naive, 0)
+    offsets = _utc_offsets(naive)
+    timestamps = naive - offsets
+    actual = _utc_offsets(timestamps)
+    exact = (
+        safe
+        & (actual == offsets)
+        & (_utc_offsets(timestamps - 86400) == actual)
+        & (_utc_offsets(timestamps + 86400) == actual)
+    )
+    return timestamps, exact
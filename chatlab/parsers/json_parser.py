@@ -4,13 +4,237 @@ ChatLab JSON 格式解析器
 支持标准 JSON 和 Python 字典格式（单引号）
 """
 
+import codecs
+import io
 import json
 import ast
+import mmap
+import multiprocessing
+import os
 import re
+import threading
 from pathlib import Path
-from typing import Union, Iterator, Optional
+from typing import Any, Union, Iterator, Optional
 from ..models import ChatSession, ChatMessage
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:  # pragma: no cover - 可选依赖
+    simdjson = None
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - 可选依赖
+    ijson = None
+
+
+# 每个线程复用一个 simdjson.Parser（Parser 内部缓冲区可复用，但不是线程安全的）
+_local = threading.local()
+
+
+def _simdjson_parser():
+    """获取当前线程的 simdjson.Parser，未安装 simdjson 时返回 None"""
+    if simdjson is None:
+        return None
+    parser = getattr(_local, "simdjson_parser", None)
+    if parser is None:
+        parser = _local.simdjson_parser = simdjson.Parser()
+    return parser
+
+
+# 19 位及以上的连续数字：可能是超出 64 位的整数
+_LONG_DIGITS_RE = re.compile(r"[0-9]{19}")
+_LONG_DIGITS_RE_B = re.compile(rb"[0-9]{19}")
+
+
+def _has_long_digits(data: Union[str, bytes]) -> bool:
+    """文本中是否含有 19 位及以上的连续数字"""
+    pattern = _LONG_DIGITS_RE_B if isinstance(data, (bytes, bytearray)) else _LONG_DIGITS_RE
+    return pattern.search(data) is not None
+
+
+def _loads(data: Union[str, bytes]) -> Any:
+    """
+    解析 JSON 文本
+
+    安装了 simdjson 时优先使用（SIMD 加速），结果会立即物化为 dict/list，
+    以便 Parser 可以被下一次调用复用；未安装时使用 orjson。它们无法处理的
+    输入（如 NaN、超出 64 位的整数）回退到标准库 json。orjson 会把超出
+    64 位的整数静默转换为 float，因此含 19 位以上连续数字的文本不交给它。
+    解析失败时抛出 ValueError。
+    """
+    parser = _simdjson_parser()
+    if parser is not None:
+        try:
+            doc = parser.parse(data.encode("utf-8") if isinstance(data, str) else data)
+        except (ValueError, RuntimeError, UnicodeEncodeError):
+            pass
+        else:
+            if isinstance(doc, simdjson.Object):
+                return doc.as_dict()
+            if isinstance(doc, simdjson.Array):
+                return doc.as_list()
+            return doc
+    elif orjson is not None and not _has_long_digits(data):
+        try:
+            return orjson.loads(data)
+        except ValueError:
+            pass
+    return json.loads(data)
+
+
+def _collect_jsonl(lines) -> tuple:
+    """
+    按 _type 分拣 JSONL 记录
+
+    Args:
+        lines: 可迭代的行（str 或 bytes），例如文件对象
+
+    Returns:
+        (header, members, messages) 三元组，header 不存在时为 None
+    """
+    header = None
+    members = []
+    messages = []
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            obj = _loads(line)
+        except ValueError:
+            continue
+
+        type_ = obj.get("_type")
+        if type_ == "header":
+            header = obj
+        elif type_ == "member":
+            members.append(obj)
+        elif type_ == "message":
+            messages.append(obj)
+
+    return header, members, messages
+
+
+# 并行解析时每个分片的最小字节数，避免小文件启动过多进程
+_PARALLEL_MIN_CHUNK = 1 << 16
+
+
+def _jsonl_chunk_ranges(mm, parts: int) -> list:
+    """把文件按字节均分为 parts 段，每段边界向后对齐到换行符"""
+    size = len(mm)
+    ranges = []
+    start = 0
+    for i in range(1, parts):
+        pos = max(size * i // parts, start)
+        end = mm.find(b'\n', pos)
+        end = size if end == -1 else end + 1
+        if end > start:
+            ranges.append((start, end))
+            start = end
+    if start < size:
+        ranges.append((start, size))
+    return ranges
+
+
+def _collect_jsonl_range(args) -> tuple:
+    """子进程入口：解析文件中 [start, end) 字节范围内的 JSONL 记录"""
+    path, start, end = args
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return _collect_jsonl(mm[start:end].split(b'\n'))
+
+
+# 对象/数组结尾前多余的逗号
+_TRAILING_COMMA_RE = re.compile(r',(\s*[}\]])')
+
+# Python 字面量中的字符串（双引号/单引号）与 True/False/None；
+# 按出现顺序匹配，因此字符串内部的关键字不会被替换
+_PY_TOKEN_RE = re.compile(
+    r""""((?:[^"\\]|\\.)*)"|'((?:[^'\\]|\\.)*)'|\b(True|False|None)\b""",
+    re.DOTALL
+)
+# 字符串内部的转义序列以及单引号字符串中未转义的双引号
+_PY_ESCAPE_RE = re.compile(r'\\(u[0-9a-fA-F]{4}|.)|"', re.DOTALL)
+_PY_KEYWORDS = {"True": "true", "False": "false", "None": "null"}
+
+
+def _convert_py_escape(match) -> str:
+    escape = match.group(1)
+    if escape is None:
+        return '\\"'
+    if escape == "'":
+        return "'"
+    if escape == "/":
+        return "\\\\/"  # Python 中 \/ 保留反斜杠，JSON 中则表示 /
+    if escape[0] == "u" and 0xD800 <= int(escape[1:], 16) <= 0xDFFF:
+        # JSON 会合并代理对而 Python 不会，交给 ast.literal_eval
+        raise ValueError("surrogate escape")
+    return match.group(0)
+
+
+def _convert_py_token(match) -> str:
+    keyword = match.group(3)
+    if keyword is not None:
+        return _PY_KEYWORDS[keyword]
+    inner = match.group(1)
+    if inner is None:
+        inner = match.group(2)
+    return '"' + _PY_ESCAPE_RE.sub(_convert_py_escape, inner) + '"'
+
+
+def _pydict_to_json(text: str) -> str:
+    """
+    将 Python 字面量文本（单引号字符串、True/False/None）转换为 JSON 文本
+
+    只处理 JSON 与 Python 语义一致的写法；其余情况（元组、非字符串键、
+    \\x 转义等）转换结果不是合法 JSON，由调用方回退到 ast.literal_eval。
+    """
+    return _PY_TOKEN_RE.sub(_convert_py_token, text)
+
+
+def _parse_python_literal(text: str) -> Optional[Any]:
+    """
+    解析 Python 字面量格式（如 WeFlow 导出的单引号字典）
+
+    先转换为 JSON 走 C 实现的解析器，失败时才使用慢得多的
+    ast.literal_eval；都失败时返回 None。
+    """
+    try:
+        return _loads(_pydict_to_json(text))
+    except ValueError:
+        pass
+
+    try:
+        return ast.literal_eval(text)
+    except Exception:
+        return None
+
+
+def _open_utf8_bytes(source: Union[str, Path], encoding: str = "utf-8"):
+    """以 UTF-8 字节流打开文件路径或字符串内容（供 ijson 使用）"""
+    if not _is_file(source):
+        return io.BytesIO(source.encode("utf-8"))
+    if codecs.lookup(encoding).name == "utf-8":
+        return open(source, 'rb')
+    return io.BytesIO(Path(source).read_text(encoding=encoding).encode("utf-8"))
+
+
+def _is_file(source) -> bool:
+    """判断 source 是否为已存在的文件路径（过长的内容字符串不会抛出 OSError）"""
+    if not isinstance(source, (str, Path)):
+        return False
+    try:
+        return Path(source).is_file()
+    except (OSError, ValueError):
+        return False
+
 
 class JSONParser:
     """
@@ -36,7 +260,7 @@ class JSONParser:
         Returns:
             ChatSession 对象
         """
-        if isinstance(source, (str, Path)) and Path(source).exists():
+        if _is_file(source):
             text = Path(source).read_text(encoding=encoding)
         else:
             text = source
@@ -48,16 +272,13 @@ class JSONParser:
 
         # 1. 尝试标准 JSON
         try:
-            data = json.loads(text)
-        except json.JSONDecodeError:
+            data = _loads(text)
+        except ValueError:
             pass
 
         # 2. 尝试 Python 字面量（单引号格式）
         if data is None:
-            try:
-                data = ast.literal_eval(text)
-            except (ValueError, SyntaxError):
-                pass
+            data = _parse_python_literal(text)
 
         # 3. 尝试修复常见错误后解析
         if data is None:
@@ -71,36 +292,39 @@ class JSONParser:
     def _try_fix_and_parse(self, text: str) -> Optional[dict]:
         """尝试修复常见格式错误"""
         # 处理尾部逗号
-        text = re.sub(r',(\s*[}\]])', r'\1', text)
+        text = _TRAILING_COMMA_RE.sub(r'\1', text)
 
         # 处理单引号包裹的字符串
-        try:
-            return ast.literal_eval(text)
-        except:
-            return None
+        return _parse_python_literal(text)
 
     def parse_stream(self, source: Union[str, Path], encoding: str = "utf-8") -> Iterator[ChatMessage]:
         """
         流式解析（用于大文件）
 
+        安装了 ijson 时增量解析 messages 数组，内存占用与文件大小无关；
+        未安装 ijson 或输入不是标准 JSON（如单引号格式）时回退到完整解析。
+
         注意：流式解析只返回消息对象，不包含会话元信息
         """
-        if isinstance(source, (str, Path)) and Path(source).exists():
-            text = Path(source).read_text(encoding=encoding)
-        else:
-            text = source
-
-        # 查找 messages 数组
-        pattern = r'["\']messages["\']\s*:\s*(\[.*?\])\s*["\']?\}'
-        match = re.search(pattern, text, re.DOTALL)
-
-        if match:
+        if ijson is not None:
+            yielded = False
             try:
-                messages_data = ast.literal_eval(match.group(1))
-                for msg_data in messages_data:
-                    yield ChatMessage.from_dict(msg_data)
-            except Exception as e:
-                self.errors.append(f"流式解析错误: {e}")
+                with _open_utf8_bytes(source, encoding) as fh:
+                    for msg_data in ijson.items(fh, 'messages.item', use_float=True):
+                        yielded = True
+                        yield ChatMessage.from_dict(msg_data)
+                return
+            except ijson.JSONError as e:
+                if yielded:
+                    self.errors.append(f"流式解析错误: {e}")
+                    return
+
+        try:
+            session = self.parse(source, encoding)
+        except ValueError as e:
+            self.errors.append(f"流式解析错误: {e}")
+            return
+        yield from session.messages
 
     def parse_jsonl(self, source: Union[str, Path], encoding: str = "utf-8") -> ChatSession:
         """
@@ -111,35 +335,65 @@ class JSONParser:
         {"_type": "member", ...}
         {"_type": "message", ...}
         """
-        if isinstance(source, (str, Path)) and Path(source).exists():
-            text = Path(source).read_text(encoding=encoding)
+        if _is_file(source):
+            # 逐行读取，峰值内存只与最长的一行有关；UTF-8 直接按字节交给解析器
+            if codecs.lookup(encoding).name == "utf-8":
+                f = open(source, 'rb')
+            else:
+                f = open(source, 'r', encoding=encoding)
+            with f:
+                header, members, messages = _collect_jsonl(f)
         else:
-            text = source
+            header, members, messages = _collect_jsonl(io.StringIO(source))
 
-        lines = text.strip().splitlines()
+        return self._build_jsonl_session(header, members, messages)
 
+    def parse_jsonl_parallel(self, source: Union[str, Path], encoding: str = "utf-8",
+                             workers: Optional[int] = None) -> ChatSession:
+        """
+        多进程解析大型 JSONL 文件
+
+        文件按字节范围切分（边界对齐到换行符），各分片在子进程中解析后
+        按原顺序合并，结果与 parse_jsonl 一致。字符串输入、非 UTF-8 编码
+        或只需一个进程时直接使用 parse_jsonl。
+
+        Args:
+            source: JSONL 文件路径或字符串
+            encoding: 文件编码
+            workers: 进程数，默认为 CPU 核数
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if not _is_file(source) or codecs.lookup(encoding).name != "utf-8":
+            return self.parse_jsonl(source, encoding)
+
+        size = os.path.getsize(source)
+        workers = min(workers, size // _PARALLEL_MIN_CHUNK + 1)
+        if workers <= 1:
+            return self.parse_jsonl(source, encoding)
+
+        with open(source, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            ranges = _jsonl_chunk_ranges(mm, workers)
+
+        path = str(source)
+        with multiprocessing.Pool(min(workers, len(ranges))) as pool:
+            results = pool.map(_collect_jsonl_range, [(path, start, end) for start, end in ranges])
+
+        # 与串行解析一致：出现多个 header 时以最后一个为准
         header = None
         members = []
         messages = []
+        for chunk_header, chunk_members, chunk_messages in results:
+            if chunk_header is not None:
+                header = chunk_header
+            members.extend(chunk_members)
+            messages.extend(chunk_messages)
 
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-
-            try:
-                obj = json.loads(line)
-                type_ = obj.get("_type")
-
-                if type_ == "header":
-                    header = obj
-                elif type_ == "member":
-                    members.append(obj)
-                elif type_ == "message":
-                    messages.append(obj)
-            except json.JSONDecodeError:
-                continue
+        return self._build_jsonl_session(header, members, messages)
 
+    @staticmethod
+    def _build_jsonl_session(header: Optional[dict], members: list, messages: list) -> ChatSession:
+        """由 JSONL 记录构建会话"""
         if not header:
             raise ValueError("JSONL 文件缺少 header 行")
 
@@ -174,7 +428,7 @@ class AutoParser:
 
     def parse(self, source: Union[str, Path]) -> ChatSession:
         """自动检测格式并解析"""
-        if isinstance(source, (str, Path)) and Path(source).exists():
+        if _is_file(source):
             path = Path(source)
             suffix = path.suffix.lower()
 
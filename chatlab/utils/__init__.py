@@ -11,9 +11,11 @@ from .helpers import (
     extract_mentions,
     extract_urls,
     extract_emails,
+    extract_entities,
     mask_sensitive_info,
     calculate_reading_time,
-    split_messages_by_time
+    split_messages_by_time,
+    split_messages_into_chunks
 )
 
 __all__ = [
@@ -25,7 +27,9 @@ __all__ = [
     'extract_mentions',
     'extract_urls',
     'extract_emails',
+    'extract_entities',
     'mask_sensitive_info',
     'calculate_reading_time',
-    'split_messages_by_time'
+    'split_messages_by_time',
+    'split_messages_into_chunks'
 ]
@@ -30,5 +30,8 @@ setup(
     ],
     extras_require={
         "dev": ["pytest", "black", "flake8"],
+        # 可选加速依赖，未安装时自动回退到标准库实现
+        "fast": ["orjson", "pysimdjson", "ijson", "google-re2"],
+        "analysis": ["numpy", "pandas", "numba"],
     },
 )
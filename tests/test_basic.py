@@ -6,10 +6,26 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+import random
+from contextlib import contextmanager
+
 import chatlab
 from chatlab.models import ChatSession, ChatMessage, ChatMember, ChatMeta, ChatLabVersion
 
 
+@contextmanager
+def _override(module, **values):
+    """临时替换模块属性（如阈值），退出时恢复"""
+    saved = {name: getattr(module, name) for name in values}
+    for name, value in values.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(module, name, value)
+
+
 def test_basic_parsing():
     """测试基础解析功能"""
     raw_data = """{'chatlab': {'version': '0.0.2', 'exportedAt': 1770985548, 'generator': 'WeFlow'}, 'meta': {'name': 'TestChat', 'platform': 'wechat', 'type': 'private', 'ownerId': 'test_id'}, 'members': [{'platformId': 'user1', 'accountName': 'User1'}], 'messages': [{'sender': 'user1', 'accountName': 'User1', 'timestamp': 1770985500, 'type': 0, 'content': 'Hello', 'platformMessageId': 'msg_1'}]}"""
@@ -45,6 +61,99 @@ def test_session_methods():
     print("✅ 会话方法测试通过")
 
 
+def test_loads_big_integers():
+    """测试超出 64 位的整数不丢失精度"""
+    from chatlab.parsers import json_parser
+
+    text = '{"platformMessageId": 123456789012345678901234567890, "n": -9223372036854775809}'
+    expected = {"platformMessageId": 123456789012345678901234567890, "n": -9223372036854775809}
+
+    assert json_parser._loads(text) == expected
+    assert json_parser._loads(text.encode("utf-8")) == expected
+
+    # 只安装 orjson 时也不能退化为 float
+    simdjson = json_parser.simdjson
+    json_parser.simdjson = None
+    try:
+        assert json_parser._loads(text) == expected
+        assert json_parser._loads(text.encode("utf-8")) == expected
+    finally:
+        json_parser.simdjson = simdjson
+
+    # 导出后再读入，整数保持不变
+    import tempfile
+    import os
+
+    raw_data = """{"chatlab": {"version": "0.0.2", "exportedAt": 1770985548, "generator": "WeFlow"}, "meta": {"name": "TestChat", "platform": "wechat", "type": "private", "ownerId": "test_id"}, "members": [], "messages": [{"sender": "user1", "accountName": "User1", "timestamp": 1770985500, "type": 0, "content": "Hi", "platformMessageId": 123456789012345678901234567890}]}"""
+    session = chatlab.loads(raw_data)
+    big_id = 123456789012345678901234567890
+    assert session.messages[0].platform_message_id == big_id
+
+    assert chatlab.loads(chatlab.saves(session, format='json')).messages[0].platform_message_id == big_id
+    assert chatlab.loads(session.to_json()).messages[0].platform_message_id == big_id
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for format in ('json', 'jsonl'):
+            temp_path = os.path.join(temp_dir, f'big.{format}')
+            chatlab.save(session, temp_path, format=format)
+            loaded = chatlab.load(temp_path, format=format)
+            assert loaded.messages[0].platform_message_id == big_id
+
+    print("✅ 大整数解析测试通过")
+
+
+def test_session_cache_invalidation():
+    """测试修改消息列表后查询缓存失效"""
+    raw_data = """{'chatlab': {'version': '0.0.2', 'exportedAt': 1770985548, 'generator': 'WeFlow'}, 'meta': {'name': 'TestChat', 'platform': 'wechat', 'type': 'private', 'ownerId': 'test_id'}, 'members': [{'platformId': 'user1', 'accountName': 'Alice'}, {'platformId': 'user2', 'accountName': 'Bob'}], 'messages': [{'sender': 'user1', 'accountName': 'Alice', 'timestamp': 1770985500, 'type': 0, 'content': 'Hi Bob', 'platformMessageId': 'msg_1'}, {'sender': 'user2', 'accountName': 'Bob', 'timestamp': 1770985560, 'type': 0, 'content': 'Hi Alice', 'platformMessageId': 'msg_2'}]}"""
+
+    session = chatlab.loads(raw_data)
+    assert session.get_message_by_id('msg_1').content == 'Hi Bob'
+
+    # 替换元素（长度不变）
+    session.messages[0] = ChatMessage(
+        sender='user1', account_name='Alice', timestamp=1770985500,
+        type=0, content='Hello', platform_message_id='msg_3'
+    )
+    assert session.get_message_by_id('msg_1') is None
+    assert session.get_message_by_id('msg_3').content == 'Hello'
+
+    # 排序 / 反转（长度不变）
+    session.messages.reverse()
+    assert [m.content for m in session.get_messages_by_keyword('h')] == ['Hi Alice', 'Hello']
+    session.messages.sort(key=lambda m: m.timestamp)
+    assert [m.content for m in session.get_messages_by_keyword('h')] == ['Hello', 'Hi Alice']
+
+    # 修改消息字段需要手动失效
+    session.messages[1].sender = 'user3'
+    session.invalidate_cache()
+    assert [m.content for m in session.get_messages_by_sender('user3')] == ['Hi Alice']
+
+    # 替换整个列表（旧列表被释放后，新列表可能复用同一内存地址）
+    def message(msg_id):
+        return ChatMessage(sender='u', account_name='U', timestamp=1770985500,
+                           type=0, content=msg_id, platform_message_id=msg_id)
+
+    for _ in range(50):
+        session.messages = [message('a')]
+        assert session.get_message_by_id('a') is not None
+        session.messages = [message('b')]
+        session.messages = [message('c')]
+        assert session.get_message_by_id('a') is None
+        assert session.get_message_by_id('c').content == 'c'
+        assert [m.content for m in session.get_messages_by_sender('u')] == ['c']
+
+    # 浅复制不共享缓存
+    import copy
+    clone = copy.copy(session)
+    assert clone._cache is not session._cache
+    clone.messages = [message('d')]
+    assert session.get_message_by_id('c') is not None
+    assert clone.get_message_by_id('c') is None
+    assert clone.get_message_by_id('d').content == 'd'
+
+    print("✅ 查询缓存失效测试通过")
+
+
 def test_export_import():
     """测试导出导入循环"""
     import tempfile
@@ -71,8 +180,461 @@ def test_export_import():
         os.unlink(temp_path)
 
 
+def test_csv_export_datetime():
+    """测试 CSV 导出的时间列与时间戳一致"""
+    import csv
+    import tempfile
+    import os
+    from datetime import datetime
+
+    raw_data = """{'chatlab': {'version': '0.0.2', 'exportedAt': 1770985548, 'generator': 'WeFlow'}, 'meta': {'name': 'TestChat', 'platform': 'wechat', 'type': 'private', 'ownerId': 'test_id'}, 'members': [{'platformId': 'user1', 'accountName': 'User1'}], 'messages': [{'sender': 'user1', 'accountName': 'User1', 'timestamp': 1700000000, 'type': 0, 'content': 'A', 'platformMessageId': 'msg_1'}, {'sender': 'user1', 'accountName': 'User1', 'timestamp': 1700086400, 'type': 0, 'content': 'B', 'platformMessageId': 'msg_2'}]}"""
+
+    session = chatlab.loads(raw_data)
+    session.get_timeline()
+
+    # 修改消息字段后未调用 invalidate_cache，导出仍需正确
+    session.messages[1].timestamp = 1800000000
+
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False, encoding='utf-8') as f:
+        temp_path = f.name
+
+    try:
+        chatlab.save(session, temp_path, format='csv')
+        with open(temp_path, newline='', encoding='utf-8') as f:
+            rows = list(csv.reader(f))[1:]
+
+        assert [int(row[0]) for row in rows] == [1700000000, 1800000000]
+        for row in rows:
+            assert row[1] == datetime.fromtimestamp(int(row[0])).strftime('%Y-%m-%d %H:%M:%S')
+
+        print("✅ CSV 时间列测试通过")
+    finally:
+        os.unlink(temp_path)
+
+
+def test_csv_parsing():
+    """测试 CSV 解析（pandas 与标准库 csv 两条路径结果一致）"""
+    import os
+    import time
+    from chatlab.parsers import CSVParser, csv_parser
+
+    times = [
+        '2024-01-02 03:04:05', '2024/01/02 03:04:05', '02/01/2024 03:04:05',
+        '2024-01-05', '12:34:56', '2024年01月02日 03:04', ' 2024-01-05 ',
+        '2024-1-5 3:04:05', '2024-01-01T10:00:00', '2024-01-01 10:00:00+08:00',
+        '1700000000', '1700000000.9', '-5.5', 'junk', '',
+        # 夏令时切换附近（America/New_York）
+        '2024-03-10 02:30:00', '2024-11-03 01:30:00',
+        # datetime 取值范围两端
+        '0001-01-01 00:00:00', '0001-01-02 00:00:00', '9999-12-29 00:00:00', '9999-12-31 23:59:59',
+    ]
+    text = 'time,sender,name,content,type\n' + ''.join(
+        f'"{t}",user{i % 3},User{i % 3},消息 {i},{i % 2 or ""}\n' for i, t in enumerate(times)
+    )
+
+    def parse_both(source):
+        with_pandas = CSVParser().parse(source)
+        with _override(csv_parser, _pandas=lambda: None):
+            stdlib_only = CSVParser().parse(source)
+        return with_pandas, stdlib_only
+
+    def by_id(session):
+        return {m.platform_message_id: (m.timestamp, m.sender, m.account_name, m.type, m.content)
+                for m in session.messages}
+
+    zones = ['UTC', 'Asia/Shanghai', 'America/New_York'] if hasattr(time, 'tzset') else [None]
+    saved_tz = os.environ.get('TZ')
+    try:
+        for zone in zones:
+            if zone is not None:
+                os.environ['TZ'] = zone
+                time.tzset()
+            with_pandas, stdlib_only = parse_both(text)
+            assert len(with_pandas.messages) == len(times)
+            assert by_id(with_pandas) == by_id(stdlib_only)
+
+            parsed = by_id(with_pandas)
+            assert parsed['csv_10'][0] == 1700000000
+            assert parsed['csv_13'][0] == 13  # 无法解析时使用行号
+            assert parsed['csv_17'][0] == 17  # 超出范围时使用行号
+            assert parsed['csv_0'][1:] == ('user0', 'User0', 0, '消息 0')
+            assert parsed['csv_1'][3] == 1
+    finally:
+        if saved_tz is None:
+            os.environ.pop('TZ', None)
+        else:
+            os.environ['TZ'] = saved_tz
+        if hasattr(time, 'tzset'):
+            time.tzset()
+
+    # 字段数不一致的行：pandas 路径回退到标准库 csv
+    ragged = 'time,sender,content\n1700000000,user1,A\n1700000060,user2,B,多余字段\n'
+    with_pandas, stdlib_only = parse_both(ragged)
+    assert by_id(with_pandas) == by_id(stdlib_only)
+    assert [m.content for m in with_pandas.messages] == ['A', 'B']
+
+    # 多个表头对应同一列时，最左边的优先
+    duplicate = 'Timestamp,time,sender,content\n1700000000,1800000000,user1,A\n'
+    for session in parse_both(duplicate):
+        assert session.messages[0].timestamp == 1700000000
+
+    print("✅ CSV 解析测试通过")
+
+
+def test_parse_stream():
+    """测试流式解析"""
+    import tempfile
+    import os
+    from chatlab.parsers import JSONParser, json_parser
+
+    raw_data = """{'chatlab': {'version': '0.0.2', 'exportedAt': 1770985548, 'generator': 'WeFlow'}, 'meta': {'name': 'TestChat', 'platform': 'wechat', 'type': 'private', 'ownerId': 'test_id'}, 'members': [{'platformId': 'user1', 'accountName': 'User1'}], 'messages': [{'sender': 'user1', 'accountName': 'User1', 'timestamp': 1770985500, 'type': 0, 'content': '你好', 'platformMessageId': 'msg_1'}, {'sender': 'user1', 'accountName': 'User1', 'timestamp': 1770985560.5, 'type': 1, 'content': 'B', 'platformMessageId': 'msg_2', 'replyTo': 'msg_1'}]}"""
+
+    session = chatlab.loads(raw_data)
+    expected = session.messages
+
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False, encoding='utf-8') as f:
+        temp_path = f.name
+
+    try:
+        chatlab.save(session, temp_path, format='json')
+
+        # 标准 JSON 文件（安装了 ijson 时增量解析）
+        streamed = list(JSONParser().parse_stream(temp_path))
+        assert streamed == expected
+        assert isinstance(streamed[0].timestamp, int)
+        assert isinstance(streamed[1].timestamp, float)
+
+        # 单引号格式不是标准 JSON，回退到完整解析
+        assert list(JSONParser().parse_stream(raw_data)) == expected
+
+        # 未安装 ijson 时的回退路径
+        with _override(json_parser, ijson=None):
+            assert list(JSONParser().parse_stream(temp_path)) == expected
+            assert list(JSONParser().parse_stream(raw_data)) == expected
+
+        # 无法解析的输入：不抛出异常，记录错误
+        parser = JSONParser()
+        assert list(parser.parse_stream("not json")) == []
+        assert parser.errors
+
+        print("✅ 流式解析测试通过")
+    finally:
+        os.unlink(temp_path)
+
+
+def test_jsonl_append():
+    """测试 JSONL 追加写入"""
+    import tempfile
+    import os
+
+    raw_data = """{'chatlab': {'version': '0.0.2', 'exportedAt': 1770985548, 'generator': 'WeFlow'}, 'meta': {'name': 'TestChat', 'platform': 'wechat', 'type': 'private', 'ownerId': 'test_id'}, 'members': [{'platformId': 'user1', 'accountName': 'User1'}], 'messages': [{'sender': 'user1', 'accountName': 'User1', 'timestamp': 1770985500, 'type': 0, 'content': 'Test message', 'platformMessageId': 'msg_1'}]}"""
+
+    session = chatlab.loads(raw_data)
+
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.jsonl', delete=False, encoding='utf-8') as f:
+        temp_path = f.name
+
+    try:
+        # 空文件时写入完整会话
+        session.append_message(ChatMessage(
+            sender='user1', account_name='User1', timestamp=1770985560,
+            type=0, content='第二条', platform_message_id='msg_2'
+        ), temp_path)
+        session.append_message(ChatMessage(
+            sender='user1', account_name='User1', timestamp=1770985620,
+            type=0, content='第三条', platform_message_id='msg_3'
+        ), temp_path)
+
+        loaded = chatlab.load(temp_path, format='jsonl')
+        assert [m.platform_message_id for m in loaded.messages] == ['msg_1', 'msg_2', 'msg_3']
+        assert loaded.messages[-1].content == '第三条'
+        assert len(loaded.members) == 1
+
+        print("✅ JSONL 追加测试通过")
+    finally:
+        os.unlink(temp_path)
+
+
+def test_jsonl_parallel():
+    """测试多进程 JSONL 解析"""
+    import tempfile
+    import os
+    from chatlab.parsers import JSONParser
+
+    raw_data = """{'chatlab': {'version': '0.0.2', 'exportedAt': 1770985548, 'generator': 'WeFlow'}, 'meta': {'name': 'TestChat', 'platform': 'wechat', 'type': 'private', 'ownerId': 'test_id'}, 'members': [{'platformId': 'user1', 'accountName': 'User1'}], 'messages': []}"""
+
+    session = chatlab.loads(raw_data)
+    session.messages = [
+        ChatMessage(
+            sender='user1', account_name='User1', timestamp=1770985500 + i,
+            type=0, content=f'第 {i} 条消息 ' * 20, platform_message_id=f'msg_{i}'
+        )
+        for i in range(2000)
+    ]
+
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.jsonl', delete=False, encoding='utf-8') as f:
+        temp_path = f.name
+
+    try:
+        chatlab.save(session, temp_path, format='jsonl')
+
+        parser = JSONParser()
+        expected = parser.parse_jsonl(temp_path)
+        loaded = parser.parse_jsonl_parallel(temp_path, workers=4)
+        assert loaded == expected
+        assert len(loaded.messages) == 2000
+
+        print("✅ JSONL 并行解析测试通过")
+    finally:
+        os.unlink(temp_path)
+
+
+def test_parse_timestamp():
+    """测试时间戳解析"""
+    from datetime import datetime
+    from chatlab.utils import parse_timestamp
+
+    assert parse_timestamp(1770985500) == datetime.fromtimestamp(1770985500)
+    # 毫秒级时间戳
+    assert parse_timestamp(1770985500123) == datetime.fromtimestamp(1770985500.123)
+    # 字符串与小数按 int() 处理
+    assert parse_timestamp("1770985500") == datetime.fromtimestamp(1770985500)
+    assert parse_timestamp(1770985500.9) == datetime.fromtimestamp(1770985500)
+    # 重复调用（命中缓存）结果不变
+    assert [parse_timestamp(1770985500 + i % 3) for i in range(10)] == \
+        [datetime.fromtimestamp(1770985500 + i % 3) for i in range(10)]
+
+    print("✅ 时间戳解析测试通过")
+
+
+def test_format_timestamp():
+    """测试时间格式化为时间戳"""
+    from datetime import datetime, timezone, timedelta
+    from chatlab.utils import format_timestamp
+
+    # 浮点运算 ts * 1000 在这里会少 1 毫秒
+    dt = datetime(1987, 1, 5, 21, 7, 10, 841000, tzinfo=timezone.utc)
+    assert format_timestamp(dt, milliseconds=True) == 536879230841
+    assert format_timestamp(dt) == 536879230
+    assert format_timestamp(dt.astimezone(timezone(timedelta(hours=8))), milliseconds=True) == 536879230841
+
+    # naive datetime 按本地时间解释
+    naive = datetime.fromtimestamp(536879230).replace(microsecond=841000)
+    assert format_timestamp(naive, milliseconds=True) == 536879230841
+    assert format_timestamp(naive) == 536879230
+
+    # 1970 年以前与 int() 一样向零取整
+    assert format_timestamp(datetime(1969, 12, 31, 23, 59, 59, 999500, tzinfo=timezone.utc), milliseconds=True) == 0
+    assert format_timestamp(datetime(1969, 12, 31, 23, 59, 58, 500000, tzinfo=timezone.utc), milliseconds=True) == -1500
+
+    print("✅ 时间戳格式化测试通过")
+
+
+def test_extract_entities():
+    """测试实体提取"""
+    from chatlab.utils import extract_entities, extract_mentions, extract_urls, extract_emails
+
+    content = "@张三 看下 https://example.com/a?b=1 ，有问题发邮件到 bob@example.com　@李四"
+    entities = extract_entities(content)
+
+    # 与 extract_mentions 相同，邮箱中的 @ 也会被识别为提及
+    assert entities["mention"] == ["张三", "example.com", "李四"]
+    assert entities["url"] == ["https://example.com/a?b=1"]
+    assert entities["email"] == ["bob@example.com"]
+
+    # 与单独提取的结果一致
+    assert extract_mentions(content) == entities["mention"]
+    assert extract_urls(content) == entities["url"]
+    assert extract_emails(content) == entities["email"]
+
+    # 顶级域名只允许字母（不含 "|"）
+    assert extract_emails("a@b.co|m c@d.com x@y.c|o") == ["a@b.co", "c@d.com"]
+
+    # 超过 2048 个字符的 URL 被忽略
+    longest = "https://example.com/" + "a" * (2048 - len("https://example.com/"))
+    too_long = longest + "a"
+    assert len(longest) == 2048
+    assert extract_urls(f"看 {longest} 和 {too_long} 以及 https://b.com") == [longest, "https://b.com"]
+    assert extract_entities(too_long)["url"] == []
+
+    print("✅ 实体提取测试通过")
+
+
+def test_escape_content():
+    """测试内容转义与反转义"""
+    from chatlab.utils import escape_content, unescape_content
+
+    # 非 ASCII 字符原样保留（不会变成乱码）
+    assert unescape_content("中文\\n换行") == "中文\n换行"
+    assert unescape_content("你好 \\'引号\\' \\t😀") == "你好 '引号' \t😀"
+    assert unescape_content("\\x41\\u4e2d\\U0001F600") == "A中😀"
+    assert unescape_content("无转义内容") == "无转义内容"
+
+    # 往返一致
+    rng = random.Random(0)
+    alphabet = "ab中文😀\\'\"\n\tx0u"
+    samples = ["", "\\", "\\'", "C:\\new\\table", "它说\"你好\""]
+    samples += ["".join(rng.choice(alphabet) for _ in range(rng.randrange(20))) for _ in range(1000)]
+    for text in samples:
+        assert unescape_content(escape_content(text)) == text
+
+    print("✅ 内容转义测试通过")
+
+
+def test_mask_sensitive_info():
+    """测试敏感信息脱敏"""
+    from chatlab.utils import mask_sensitive_info
+
+    # 手机号
+    assert mask_sensitive_info("电话 13812345678，谢谢") == "电话 ***，谢谢"
+    assert mask_sensitive_info("座机 12345678901") == "座机 12345678901"
+    # 身份证号（末位 X/x）整体替换，不残留片段
+    assert mask_sensitive_info("身份证 11010119900101123X 已提交") == "身份证 *** 已提交"
+    assert mask_sensitive_info("身份证 11010119900101123x") == "身份证 ***"
+    assert mask_sensitive_info("身份证 110101199001011234") == "身份证 ***"
+    # 16-19 位银行卡号，更长的数字串只替换前 19 位
+    assert mask_sensitive_info("卡号 6222021234567890") == "卡号 ***"
+    assert mask_sensitive_info("卡号 6222021234567890123") == "卡号 ***"
+    assert mask_sensitive_info("12345678901234567890") == "***0"
+    # 全角数字与 re 的 \d 一致：长数字串会被替换，手机号分支只认 ASCII
+    assert mask_sensitive_info("卡号 ６２２２０２１２３４５６７８９０") == "卡号 ***"
+    assert mask_sensitive_info("手机 １３８１２３４５６７８") == "手机 １３８１２３４５６７８"
+    # 自定义掩码、无数字文本
+    assert mask_sensitive_info("13812345678", mask="[手机号]") == "[手机号]"
+    assert mask_sensitive_info("没有数字") == "没有数字"
+
+    print("✅ 敏感信息脱敏测试通过")
+
+
+def test_split_messages():
+    """测试按时间间隔分割消息"""
+    from chatlab.utils import split_messages_by_time, split_messages_into_chunks
+
+    raw_data = """{'chatlab': {'version': '0.0.2', 'exportedAt': 1770985548, 'generator': 'WeFlow'}, 'meta': {'name': 'TestChat', 'platform': 'wechat', 'type': 'private', 'ownerId': 'test_id'}, 'members': [{'platformId': 'user1', 'accountName': 'User1'}], 'messages': [{'sender': 'user1', 'accountName': 'User1', 'timestamp': 1770985500, 'type': 0, 'content': 'A', 'platformMessageId': 'msg_1'}, {'sender': 'user1', 'accountName': 'User1', 'timestamp': 1770985560, 'type': 0, 'content': 'B', 'platformMessageId': 'msg_2'}, {'sender': 'user1', 'accountName': 'User1', 'timestamp': 1770990000, 'type': 0, 'content': 'C', 'platformMessageId': 'msg_3'}]}"""
+
+    session = chatlab.loads(raw_data)
+
+    assert split_messages_by_time(session.messages, max_gap_minutes=30) == [(0, 2), (2, 3)]
+    assert split_messages_by_time(session, max_gap_minutes=120) == [(0, 3)]
+    assert split_messages_by_time([], max_gap_minutes=30) == []
+
+    chunks = split_messages_into_chunks(session.messages, max_gap_minutes=30)
+    assert [[m.content for m in chunk] for chunk in chunks] == [['A', 'B'], ['C']]
+    assert session.get_conversation_threads(max_gap_minutes=30) == chunks
+
+    print("✅ 消息分割测试通过")
+
+
+def test_vectorized_session_paths():
+    """测试大会话的向量化实现与逐条计算结果一致"""
+    from chatlab import models
+    from chatlab.utils import helpers, split_messages_by_time
+
+    rng = random.Random(0)
+    # 含孤立代理字符（被截断的 emoji）
+    words = ['Hello', 'İstanbul', 'ΣΑΣ', 'straße', '你好', 'is', '', 'hi \ud83d']
+
+    def make_session(float_ts):
+        messages = []
+        ts = 1700000000
+        for i in range(3000):
+            ts += rng.choice([0, 1, 59, 1799, 1800, 1801, 7200, 86400])
+            if float_ts:
+                ts += rng.choice([0, 0.25, 0.5])
+            sender = f'user{rng.randrange(20)}'
+            messages.append(ChatMessage(
+                sender=sender, account_name=None if rng.random() < 0.1 else sender.upper(),
+                timestamp=ts,
+                type=rng.randrange(10),
+                content=' '.join(rng.choice(words) for _ in range(rng.randrange(4))),
+                platform_message_id=f'msg_{i}'
+            ))
+        return ChatSession(
+            chatlab=ChatLabVersion(version='0.0.2', exported_at=0, generator='test'),
+            meta=ChatMeta(name='TestChat', platform='wechat', type='group', owner_id='user0'),
+            members=[], messages=messages
+        )
+
+    def results(session):
+        session.invalidate_cache()
+        return {
+            "timeline": session.get_timeline(),
+            "sender_stats": session.get_sender_stats(),
+            "keyword": [
+                session.get_messages_by_keyword(keyword, case_sensitive)
+                for keyword in ['is', 'σας', 'İ', 'STRASSE', 'hello', '好', 'hi', '\ud83d']
+                for case_sensitive in (False, True)
+            ],
+            "split": [
+                (split_messages_by_time(session, gap), split_messages_by_time(session.messages, gap))
+                for gap in (0, 1, 30, 120)
+            ],
+            "threads": session.get_conversation_threads(30),
+        }
+
+    for float_ts in (False, True):
+        session = make_session(float_ts)
+        with _override(models, _VECTORIZE_THRESHOLD=10 ** 9), \
+                _override(helpers, _VECTORIZE_THRESHOLD=10 ** 9):
+            expected = results(session)
+
+        with _override(models, _VECTORIZE_THRESHOLD=1), _override(helpers, _VECTORIZE_THRESHOLD=1):
+            assert results(session) == expected
+            # 未安装 numba 时的 numpy 实现
+            with _override(helpers, _numba_kernel=lambda func: None):
+                assert results(session) == expected
+
+    print("✅ 向量化路径一致性测试通过")
+
+
+def test_text_kernel_paths():
+    """测试长文本内核（numba/RE2）与正则实现结果一致"""
+    from chatlab.utils import helpers, mask_sensitive_info, calculate_reading_time
+
+    rng = random.Random(0)
+    alphabet = '0123456789' * 3 + '０１９١' + 'XxAb 中文@'
+    texts = ['', '13812345678', '110101199001011234X', '６２２２０２１２３４５６７８９０１２']
+    texts += [''.join(rng.choice(alphabet) for _ in range(rng.randrange(80))) for _ in range(2000)]
+
+    def results():
+        return [(mask_sensitive_info(t), mask_sensitive_info(t, '#'), calculate_reading_time(t, 5))
+                for t in texts]
+
+    # 长文本内核只在 numba 已导入时启用
+    try:
+        import numba
+    except ImportError:
+        pass
+
+    with _override(helpers, _KERNEL_MIN_LENGTH=10 ** 9, _RE2_MIN_LENGTH=10 ** 9):
+        expected = results()
+    assert [r[0] for r in expected] == [helpers._SENSITIVE_RE.sub('***', t) for t in texts]
+
+    with _override(helpers, _KERNEL_MIN_LENGTH=0):
+        assert results() == expected
+    with _override(helpers, _KERNEL_MIN_LENGTH=10 ** 9, _RE2_MIN_LENGTH=0):
+        assert results() == expected
+
+    print("✅ 长文本内核一致性测试通过")
+
+
 if __name__ == "__main__":
     test_basic_parsing()
     test_session_methods()
+    test_loads_big_integers()
+    test_session_cache_invalidation()
     test_export_import()
+    test_csv_export_datetime()
+    test_csv_parsing()
+    test_parse_stream()
+    test_jsonl_append()
+    test_jsonl_parallel()
+    test_parse_timestamp()
+    test_format_timestamp()
+    test_extract_entities()
+    test_escape_content()
+    test_mask_sensitive_info()
+    test_split_messages()
+    test_vectorized_session_paths()
+    test_text_kernel_paths()
     print("\n🎉 所有测试通过！")